@@ -1,15 +1,26 @@
+import aiohttp
 import asyncio
 import logging
+import logging.handlers
 import os
+import queue
+import re
 import sqlite3
-from cron_converter import Cron
-from datetime import datetime, date
+import time
+import unicodedata
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
 from signal_bot_framework import create, AccountNumber, SignalBot
-from signal_bot_framework.aliases import Context, DataMessage, CronCb, AccountUUID
+from signal_bot_framework.aliases import Context, DataMessage, AccountUUID
 from signal_bot_framework.args import ListContactArgs
 from slack_bolt.async_app import AsyncApp
 from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
 
+try:
+    import uvloop # Optional; a faster drop-in event loop
+except ImportError:
+    uvloop = None
+
 SLACK_BOT_TOKEN = os.environ.get("SLACK_BOT_TOKEN")
 SLACK_APP_TOKEN = os.environ.get("SLACK_APP_TOKEN")
 TARGET_CHANNEL_ID = os.environ.get("TARGET_CHANNEL_ID")
@@ -17,6 +28,10 @@ CHAT_ID = os.environ.get("CHAT_ID")
 MUSTERBOT_ID = os.environ.get("MUSTERBOT_ID")
 DATABASE_FILE = os.environ.get("DATABASE_FILE")
 REPORTING_USER_ID = os.environ.get("REPORTING_USER_ID")
+# Without both Slack tokens the bot runs Signal-only and never opens a Slack connection
+ENABLE_SLACK = bool(SLACK_BOT_TOKEN and SLACK_APP_TOKEN)
+# Set to any value to enable the /test_* debugging commands
+MUSTERBOT_DEBUG = bool(os.environ.get("MUSTERBOT_DEBUG"))
 
 # --- Emoji Status Mapping (Now with Emojis as keys) ---
 STATUS_MAP = {
@@ -29,142 +44,406 @@ STATUS_MAP = {
     "❓": {"text": "Other", "prompt": "Please provide your status for the day.", "hint": "question mark"}
 }
 
+def emoji_key(emoji):
+    """Normalizes an emoji so variants with and without the emoji presentation selector compare equal."""
+    return unicodedata.normalize("NFC", emoji).replace("\ufe0f", "")
+
+# (text, prompt) for each status emoji, for the reaction handler
+STATUS_LOOKUP = {emoji_key(emoji): (status["text"], status["prompt"]) for emoji, status in STATUS_MAP.items()}
+CHECKIN_INSTRUCTIONS = "\n".join(f"{emoji} (search '{status['hint']}') - {status['text']}" for emoji, status in STATUS_MAP.items())
+REMINDER_TEXT = "Just a friendly reminder to please check in for today. ☀️"
+HELP_LINES = [
+    "*MusterBot Commands*",
+    "",
+    "*/help* - Show this help message",
+    "*/status [date]* - Check your status for a given date (e.g., /status 2024-10-27). Defaults to today.",
+    "*/leave [add/remove] [start_date YYYY-MM-DD] [end_date YYYY-MM-DD]* - Add or remove leave.",
+    "*/tdy [add/remove] [start_date YYYY-MM-DD] [end_date YYYY-MM-DD]* - Add or remove tdy/training.",
+]
+ADMIN_HELP_LINES = [
+    "",
+    "*Admin Commands*",
+    "*/config [key] [value]* - View or set a configuration value (e.g., /config checkin_time 08:30)",
+    "*/holiday [add/remove] [YYYY-MM-DD] [description]* - Add or remove a holiday.",
+    "*/add_admin [@user]* - Add a new admin.",
+    "*/status [user] [date]* - Check a user's status",
+    "*/get_members* - Get the members of the group",
+    "*/post_checkin* - Manually post the daily check-in message.",
+    "*/post_summary* - Manually post the daily summary.",
+]
+HELP_TEXT = "\n".join(HELP_LINES) + "\n"
+ADMIN_HELP_TEXT = "\n".join(HELP_LINES + ADMIN_HELP_LINES) + "\n"
+# Screens command arguments before date.fromisoformat so malformed input doesn't need an exception
+DATE_RE = re.compile(r"\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])")
+# 24-hour H:MM or HH:MM, as stored in the config table's *_time keys
+TIME_RE = re.compile(r"([01]?\d|2[0-3]):([0-5]\d)")
+# Seeded into the config table, and used in place of any stored time that won't parse
+DEFAULT_JOB_TIMES = {'checkin_time': '06:00', 'reminder_time': '09:00', 'summary_time': '10:00'}
+
+# Check-in messages older than this many days no longer accept reactions
+DAILY_MESSAGE_TTL_DAYS = 1
+# ...and at most this many are tracked at once, however often /post_checkin is used
+MAX_DAILY_MESSAGES = 30
+# Follow-up prompts that go unanswered for this many seconds are forgotten
+PENDING_STATUS_TTL = 24 * 60 * 60
+
+# Profile names are looked up over RPC, so remember them for this many seconds
+USERNAME_CACHE_TTL = 24 * 60 * 60
+# ...and the group's member list for this many
+GROUP_MEMBERS_CACHE_TTL = 5 * 60
+
 daily_message_ts = {}
 update_status_ts = {}
+username_cache = {}
+group_members_cache = {"members": None, "fetched_at": 0.0}
 slack_app = None
 
+# In-memory mirrors of the holidays and admins tables, kept in sync by the commands that change them
+holiday_dates = set()
+admin_ids = set()
+
 # -- Database Setup ---
+_db_conn = None
+_db_write_lock = asyncio.Lock()
+
 def db_connect():
-    return sqlite3.connect(DATABASE_FILE) # type: ignore
+    """Returns the shared database connection, opening it on first use."""
+    global _db_conn
+    if _db_conn is None:
+        # Autocommit mode; every write is its own transaction unless explicitly grouped.
+        # All SQL uses ? placeholders, so a larger statement cache keeps every query prepared.
+        _db_conn = sqlite3.connect(DATABASE_FILE, check_same_thread=False, isolation_level=None, cached_statements=256) # type: ignore
+        # Rows can be read by column name as well as unpacked like tuples
+        _db_conn.row_factory = sqlite3.Row
+        # WAL lets the summary/reminder reads run alongside message logging writes, and
+        # synchronous=NORMAL only fsyncs at checkpoints instead of on every commit.
+        _db_conn.execute("PRAGMA journal_mode=WAL")
+        _db_conn.execute("PRAGMA synchronous=NORMAL")
+        _db_conn.execute("PRAGMA temp_store=MEMORY")
+        _db_conn.execute("PRAGMA cache_size=-20000")
+        _db_conn.execute("PRAGMA mmap_size=67108864")
+        _db_conn.execute("PRAGMA busy_timeout=5000")
+    return _db_conn
+
+def db_close():
+    """Closes the shared database connection, if it is open."""
+    global _db_conn
+    if _db_conn is not None:
+        _db_conn.close()
+        _db_conn = None
 
 def setup_database():
     """Initializes the SQLite database and creates tables if they don't exist."""
     conn = db_connect()
     cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS responses (
-            id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, user_name TEXT NOT NULL,
-            response_date TEXT NOT NULL, response_text TEXT NOT NULL, details TEXT
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY, sender_id TEXT NOT NULL, sender_name TEXT NOT NULL, 
-            destination_id TEXT NOT NULL, sent_timestamp TEXT NOT NULL, message TEXT NOT NULL
-        )               
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS leave (
-            id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, user_name TEXT NOT NULL, 
-            start_date TEXT NOT NULL, end_date TEXT NOT NULL
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS tdy (
-            id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, start_date TEXT NOT NULL,
-            end_date TEXT NOT NULL, description TEXT NOT NULL 
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS holidays (
-            holiday_date TEXT PRIMARY KEY, description TEXT NOT NULL
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS admins (
-            user_id TEXT PRIMARY KEY
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS config (
-            key TEXT PRIMARY KEY, value TEXT NOT NULL
+    # Schema and seed data are applied atomically. executescript() commits any open transaction
+    # before it runs, so the BEGIN goes inside the script rather than using db_transaction().
+    try:
+        # Dates are stored as YYYY-MM-DD text so they sort and compare chronologically as plain strings.
+        # Compare the columns directly (e.g. `start_date <= ?`); wrapping them in date()/strftime() stops
+        # SQLite from using the indexes below. The CHECKs reject anything that isn't in that form.
+        cursor.executescript('''
+            BEGIN IMMEDIATE;
+
+            CREATE TABLE IF NOT EXISTS responses (
+                id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, user_name TEXT NOT NULL,
+                response_date TEXT NOT NULL CHECK(length(response_date) = 10), response_text TEXT NOT NULL, details TEXT
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY, sender_id TEXT NOT NULL, sender_name TEXT NOT NULL,
+                destination_id TEXT NOT NULL, sent_timestamp TEXT NOT NULL, message TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS leave (
+                id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, user_name TEXT NOT NULL,
+                start_date TEXT NOT NULL CHECK(length(start_date) = 10), end_date TEXT NOT NULL CHECK(length(end_date) = 10)
+            );
+            CREATE TABLE IF NOT EXISTS tdy (
+                id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, start_date TEXT NOT NULL CHECK(length(start_date) = 10),
+                end_date TEXT NOT NULL CHECK(length(end_date) = 10), description TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS holidays (
+                holiday_date TEXT PRIMARY KEY CHECK(length(holiday_date) = 10), description TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS admins (
+                user_id TEXT PRIMARY KEY
+            );
+            CREATE TABLE IF NOT EXISTS config (
+                key TEXT PRIMARY KEY, value TEXT NOT NULL
+            );
+
+            -- Indexes for the per-day summary/reminder lookups and the per-user leave/TDY checks
+            CREATE INDEX IF NOT EXISTS idx_responses_date ON responses(response_date);
+            CREATE INDEX IF NOT EXISTS idx_responses_date_user ON responses(response_date, user_id);
+            CREATE INDEX IF NOT EXISTS idx_leave_user ON leave(user_id, start_date, end_date);
+            CREATE INDEX IF NOT EXISTS idx_tdy_user ON tdy(user_id, start_date, end_date);
+            CREATE INDEX IF NOT EXISTS idx_messages_ts ON messages(sent_timestamp);
+
+            -- One response per user per day; keep only the latest of any duplicates recorded before this index existed
+            DELETE FROM responses WHERE id NOT IN (SELECT MAX(id) FROM responses GROUP BY user_id, response_date);
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_responses_user_date ON responses(user_id, response_date);
+        ''')
+        # Seed initial data if tables are empty
+        cursor.executemany(
+            "INSERT OR IGNORE INTO config (key, value) VALUES (?, ?)",
+            list(DEFAULT_JOB_TIMES.items())
         )
-    ''')
-    # Seed initial data if tables are empty
-    cursor.execute("INSERT OR IGNORE INTO config (key, value) VALUES ('checkin_time', '06:00')")
-    cursor.execute("INSERT OR IGNORE INTO config (key, value) VALUES ('reminder_time', '09:00')")
-    cursor.execute("INSERT OR IGNORE INTO config (key, value) VALUES ('summary_time', '10:00')")
-    # Add the reporting user as the first admin
-    if REPORTING_USER_ID:
-        cursor.execute("INSERT OR IGNORE INTO admins (user_id) VALUES (?)", (REPORTING_USER_ID,))
-    conn.commit()
-    conn.close()
+        # Add the reporting user as the first admin
+        if REPORTING_USER_ID:
+            cursor.execute("INSERT OR IGNORE INTO admins (user_id) VALUES (?)", (REPORTING_USER_ID,))
+        cursor.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    # Load caches
+    cursor.execute("SELECT holiday_date FROM holidays")
+    holiday_dates.clear()
+    holiday_dates.update(row["holiday_date"] for row in cursor)
+    cursor.execute("SELECT user_id FROM admins")
+    admin_ids.clear()
+    admin_ids.update(row["user_id"] for row in cursor)
     logging.info("Database initialized.")
 
+@contextmanager
+def db_transaction():
+    """Groups the statements run inside the block into a single transaction on the shared connection."""
+    conn = db_connect()
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+# --- Message Log ---
+MESSAGE_LOG_FLUSH_INTERVAL = 0.5 # seconds
+message_log_queue = asyncio.Queue()
+
+def log_message(context: Context, message: DataMessage):
+    """Queues a message to be written to the messages table by message_log_flusher."""
+    message_log_queue.put_nowait((message.sender_uuid, message.sender_name, context[1], message.timestamp, message.message))
+
+def take_message_log():
+    """Empties the message log queue and returns what was in it."""
+    batch = []
+    while not message_log_queue.empty():
+        batch.append(message_log_queue.get_nowait())
+    return batch
+
+def write_message_log(batch):
+    """Writes a batch of queued messages to the database in a single transaction."""
+    with db_transaction() as conn:
+        conn.executemany(
+            "INSERT INTO messages (sender_id, sender_name, destination_id, sent_timestamp, message) VALUES (?, ?, ?, ?, ?)",
+            batch
+        )
+
+async def message_log_flusher():
+    """Writes queued messages in batches, sleeping while the queue is empty. Flushes one last time when cancelled."""
+    batch = []
+    writing = None
+    try:
+        while True:
+            batch.append(await message_log_queue.get())
+            # Let the rest of a burst arrive so it lands in the same transaction
+            await asyncio.sleep(MESSAGE_LOG_FLUSH_INTERVAL)
+            batch += take_message_log()
+            async with _db_write_lock:
+                # The write runs on a worker thread so the event loop isn't stalled on disk I/O.
+                # It is shielded so cancellation can't abandon it halfway through a transaction.
+                writing = asyncio.ensure_future(asyncio.to_thread(write_message_log, batch))
+                batch = []
+                try:
+                    await asyncio.shield(writing)
+                except asyncio.CancelledError:
+                    # Hold the lock until the worker's transaction ends, so no other write can land inside it
+                    await asyncio.wait([writing])
+                    raise
+                except Exception as e:
+                    logging.error(f"Error logging messages: {e}")
+    finally:
+        if writing is not None and not writing.done():
+            await asyncio.wait([writing])
+        batch += take_message_log()
+        if batch:
+            write_message_log(batch)
+
+# --- Slack Outbox ---
+SLACK_POST_INTERVAL = 1.0 # seconds; Slack allows roughly one message per second per channel
+SLACK_BATCH_SIZE = 20
+slack_outbox = asyncio.Queue()
+
+def post_to_slack(channel, text):
+    """Queues a message to be posted to Slack by slack_outbox_flusher."""
+    if not ENABLE_SLACK:
+        return
+    slack_outbox.put_nowait((channel, text))
+
+async def slack_outbox_flusher():
+    """Posts queued Slack messages, combining whatever is queued for the same channel into one post."""
+    try:
+        while True:
+            batch = [await slack_outbox.get()]
+            while len(batch) < SLACK_BATCH_SIZE and not slack_outbox.empty():
+                batch.append(slack_outbox.get_nowait())
+            texts_by_channel = {}
+            for channel, text in batch:
+                texts_by_channel.setdefault(channel, []).append(text)
+            for channel, texts in texts_by_channel.items():
+                try:
+                    await slack_app.client.chat_postMessage(channel=channel, text="\n\n".join(texts)) # type: ignore
+                except Exception as e:
+                    logging.error(f"Failed to post to Slack: {e}")
+            await asyncio.sleep(SLACK_POST_INTERVAL)
+    finally:
+        if not slack_outbox.empty():
+            logging.warning(f"Dropping {slack_outbox.qsize()} unsent Slack message(s)")
+
 # --- Helper Functions ---
 def is_admin(user_id):
     """Checks if a user_id is in the admins table."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM admins WHERE user_id = ?", (user_id,))
-    is_admin_user = cursor.fetchone() is not None
-    conn.close()
-    return is_admin_user
+    return user_id in admin_ids
+
+def parse_date(date_str):
+    """Parses a YYYY-MM-DD string, returning None if it isn't a valid date."""
+    if not DATE_RE.fullmatch(date_str):
+        return None
+    try:
+        # Still raises for days the pattern allows but the month doesn't have, like 2025-02-30
+        return date.fromisoformat(date_str)
+    except ValueError:
+        return None
+
+def parse_time(time_str):
+    """Parses a 24-hour H:MM or HH:MM string into (hour, minute), returning None if it isn't a valid time."""
+    match = TIME_RE.fullmatch(time_str)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
 
 def is_workday(check_date):
     """Checks if a given date is a workday (not weekend or holiday)."""
     if check_date.weekday() >= 5: # Saturday or Sunday
         return False
+    return check_date.isoformat() not in holiday_dates
+
+def get_daily_statuses(user_ids, check_date):
+    """Returns (user_id, tdy_description, on_leave, response_text, details) for each user, in order, from one query."""
+    if not user_ids:
+        return []
+    check_date_str = check_date.isoformat()
+    members = ", ".join("(?, ?)" for _ in user_ids)
+    params = [value for position, user_id in enumerate(user_ids) for value in (position, user_id)]
+    params += [check_date_str] * 5
     conn = db_connect()
     cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM holidays WHERE holiday_date = ?", (check_date.strftime("%Y-%m-%d"),))
-    is_holiday = cursor.fetchone() is not None
-    conn.close()
-    return not is_holiday
-
-def is_user_on_leave(user_id, check_date):
-    """Checks if a user is on leave on a specific date."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute("SELECT start_date, end_date FROM leave WHERE user_id = ?", (user_id,))
-    leave_periods = cursor.fetchall()
-    conn.close()
-
-    for start_str, end_str in leave_periods:
-        start_date = date.fromisoformat(start_str)
-        end_date = date.fromisoformat(end_str)
-        if start_date <= check_date <= end_date:
-            return True
-    return False
-
-def get_user_tdy_status(user_id, check_date):
-    """Checks if a user is on TDY on a specific date and returns the description if they are."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute("SELECT start_date, end_date, description FROM tdy WHERE user_id = ?", (user_id,))
-    tdy_periods = cursor.fetchall()
-    conn.close()
-
-    for start_str, end_str, description in tdy_periods:
-        start_date = date.fromisoformat(start_str)
-        end_date = date.fromisoformat(end_str)
-        if start_date <= check_date <= end_date:
-            return description  # Return the description of the TDY
-    return None
+    # Correlated subqueries (rather than joins) for TDY and leave so overlapping periods can't duplicate a member
+    cursor.execute(f"""
+        WITH members(position, user_id) AS (VALUES {members})
+        SELECT m.user_id,
+            (SELECT t.description FROM tdy t WHERE t.user_id = m.user_id AND t.start_date <= ? AND t.end_date >= ? LIMIT 1) AS tdy_description,
+            EXISTS (SELECT 1 FROM leave l WHERE l.user_id = m.user_id AND l.start_date <= ? AND l.end_date >= ?) AS on_leave,
+            r.response_text, r.details
+        FROM members m
+        LEFT JOIN responses r ON r.user_id = m.user_id AND r.response_date = ?
+        ORDER BY m.position
+    """, params)
+    return cursor.fetchall()
 
 async def get_username_from_userid(signal: SignalBot, user_id: AccountUUID):
+    cached = username_cache.get(user_id)
+    if cached is not None and time.monotonic() - cached[1] < USERNAME_CACHE_TTL:
+        return cached[0]
     user_info_task = await signal.list_contacts(args=ListContactArgs(recipient=user_id)) # type: ignore
     user_info_object = await user_info_task
     user_info = user_info_object.result[0]
     givenName = user_info['profile']['givenName'] if user_info['profile']['givenName'] else ''
     familyName = user_info['profile']['familyName'] if user_info['profile']['familyName'] else ''
-    return f"{givenName} {familyName}"
-
-def add_cron_while_running(signal: SignalBot, cron_hook: CronCb):
+    username = f"{givenName} {familyName}"
+    username_cache[user_id] = (username, time.monotonic())
+    return username
+
+def prune_daily_messages(today):
+    """Forgets check-in messages that are too old to still be reacted to."""
+    cutoff = (today - timedelta(days=DAILY_MESSAGE_TTL_DAYS)).isoformat()
+    for timestamp in [timestamp for timestamp, day in daily_message_ts.items() if day < cutoff]:
+        del daily_message_ts[timestamp]
+    # dicts keep insertion order, so the first keys are the oldest messages
+    while len(daily_message_ts) > MAX_DAILY_MESSAGES:
+        del daily_message_ts[next(iter(daily_message_ts))]
+
+def prune_pending_statuses():
+    """Forgets follow-up prompts that were never answered."""
+    cutoff = time.monotonic() - PENDING_STATUS_TTL
+    for user_id in [user_id for user_id, info in update_status_ts.items() if info["inserted_at"] < cutoff]:
+        del update_status_ts[user_id]
+
+def log_task_failure(task: asyncio.Task):
+    """Done-callback for background tasks: logs the exception that ended the task, if any."""
+    if not task.cancelled() and (ex := task.exception()) is not None:
+        logging.error(f"Background task {task.get_name()} failed: {ex}", exc_info=ex)
+
+async def send_and_confirm(signal: SignalBot, to, text):
+    """Sends a message and waits for signal-cli to confirm it was sent."""
+    response_task = await signal.send_message(to, text)
+    return await response_task
+
+def next_weekday_at(hour: int, minute: int, after: datetime) -> datetime:
+    """Returns the first Monday-Friday occurrence of hour:minute strictly after `after`."""
+    fire_at = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if fire_at <= after:
+        fire_at += timedelta(days=1)
+    while fire_at.weekday() >= 5:
+        fire_at += timedelta(days=1)
+    return fire_at
+
+def schedule_weekday_jobs(signal: SignalBot, jobs, ref: datetime | None = None):
+    """Arms each (hour, minute, callback) in `jobs` for its next weekday run; stop_crons() cancels them like any cron."""
     loop = asyncio.get_running_loop()
-    ref = datetime.now()
-    cron_str, _ = cron_hook # type: ignore
-    cron = Cron(cron_str)
-    schedule = cron.schedule(ref)
-    next_schedule = schedule.next()
-    delay = (next_schedule - ref).total_seconds()
-    signal._crons.append(loop.call_later(delay, signal._cron_repeat, signal, schedule, cron_hook)) # type: ignore
-
-async def get_all_users(signal: SignalBot):
+    if ref is None:
+        ref = datetime.now()
+    now = datetime.now()
+    handles = []
+    for hour, minute, callback in jobs:
+        # One bad time only loses that job, not the rest of the batch
+        try:
+            fire_at = next_weekday_at(hour, minute, ref)
+        except ValueError as e:
+            logging.error(f"Not scheduling {callback.__name__} at {hour}:{minute}: {e}")
+            continue
+        delay = (fire_at - now).total_seconds()
+        handles.append(loop.call_later(delay, run_weekday_job, signal, hour, minute, callback, fire_at))
+    signal._crons.extend(handles) # type: ignore
+
+def schedule_weekday_job(signal: SignalBot, hour: int, minute: int, callback, ref: datetime | None = None):
+    """Arms `callback` for the next weekday at hour:minute."""
+    schedule_weekday_jobs(signal, [(hour, minute, callback)], ref)
+
+def run_weekday_job(signal: SignalBot, hour: int, minute: int, callback, fired_at: datetime):
+    def _reschedule(task: asyncio.Task):
+        cron_info = ('cron', f"{minute} {hour} * * 1-5", callback)
+        if (ex := task.exception()) is not None and not signal.handle_callback_exception(ex, cron_info): # type: ignore
+            return
+        # Drop handles that have already fired before arming the next one
+        now = asyncio.get_running_loop().time()
+        signal._crons[:] = [handle for handle in signal._crons if handle.when() >= now] # type: ignore
+        # Compute from the scheduled time so an early wakeup can't fire twice in one day
+        schedule_weekday_job(signal, hour, minute, callback, max(fired_at, datetime.now()))
+
+    asyncio.ensure_future(callback(signal)).add_done_callback(_reschedule)
+
+async def get_all_users(signal: SignalBot, refresh: bool = False):
+    """Returns the group's members, reusing the last fetch for GROUP_MEMBERS_CACHE_TTL seconds."""
+    members = group_members_cache["members"]
+    if not refresh and members is not None and time.monotonic() - group_members_cache["fetched_at"] < GROUP_MEMBERS_CACHE_TTL:
+        return members
     group_info_task = await signal.get_group_info(CHAT_ID) # type: ignore
     group_info_response = await group_info_task
     group_info = group_info_response.result[0]
     all_users = [member for member in group_info['members']] # type: ignore
+    group_members_cache["members"] = all_users
+    group_members_cache["fetched_at"] = time.monotonic()
     return all_users
 
 # --- Cron Callbacks ---
@@ -176,13 +455,13 @@ async def post_daily_checkin_callback(signal: SignalBot):
         return
 
     logging.info("In post_daily_checkin")
-    today_str = today.strftime("%Y-%m-%d")
-    instructions = "\n".join(f"{emoji} (search '{status['hint']}') - {status['text']}" for emoji, status in STATUS_MAP.items())
-    message = f"☀️ Good morning! Please check in for {today_str} by reacting to this message. \n\n{instructions}"
+    today_str = today.isoformat()
+    message = f"☀️ Good morning! Please check in for {today_str} by reacting to this message. \n\n{CHECKIN_INSTRUCTIONS}"
     response_task = await signal.send_message(CHAT_ID, message) # type: ignore
     response_object = await response_task
     the_result = response_object.result
     daily_message_ts[the_result['timestamp']] = today_str
+    prune_daily_messages(today)
     logging.info(signal._crons) # type: ignore
 
 async def post_daily_summary_callback(signal: SignalBot):
@@ -192,40 +471,33 @@ async def post_daily_summary_callback(signal: SignalBot):
         return
 
     logging.info("post_daily_summary_callback")
-    today_str = today.strftime("%Y-%m-%d")
-    summary_text = f"*Daily Status Summary for {today_str}*\n"
+    today_str = today.isoformat()
+    summary_lines = [f"*Daily Status Summary for {today_str}*", ""]
     try:
-        group_info_task = await signal.get_group_info(CHAT_ID) # type: ignore
-        group_info_response = await group_info_task
-        group_info = group_info_response.result[0]
-        all_users = [member['uuid'] for member in group_info['members'] if member['number'] != MUSTERBOT_ID] # type: ignore
+        all_users = [member['uuid'] for member in await get_all_users(signal) if member['number'] != MUSTERBOT_ID] # type: ignore
         
-        conn = db_connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT user_id, response_text, details FROM responses WHERE response_date = ?", (today_str,))
-        responses = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
-        conn.close()
-
-        for user_id in all_users:
-            tdy_status = get_user_tdy_status(user_id, today)
-            if tdy_status:
-                status_line = f"✈️ *{tdy_status}*"
-            elif is_user_on_leave(user_id, today):
+        statuses = get_daily_statuses(all_users, today)
+        user_names = await asyncio.gather(*(get_username_from_userid(signal, user_id) for user_id in all_users))
+        for user_name, status in zip(user_names, statuses):
+            if status["tdy_description"]:
+                status_line = f"✈️ *{status['tdy_description']}*"
+            elif status["on_leave"]:
                 status_line = f"🌴 On Leave"
-            elif user_id in responses:
-                response, details = responses[user_id]
-                details_text = f" ({details})" if details else ""
-                status_line = f"{response} {details_text}"
+            elif status["response_text"] is not None:
+                details_text = f" ({status['details']})" if status["details"] else ""
+                status_line = f"{status['response_text']} {details_text}"
             else:
                 status_line = "❌ Not Checked In"
-            user_name = await get_username_from_userid(signal, user_id)
-            summary_text += f"\n• {user_name}: {status_line}"
+            summary_lines.append(f"• {user_name}: {status_line}")
+        summary_text = "\n".join(summary_lines)
 
-        await signal.send_message(CHAT_ID, summary_text) # type: ignore
-        await slack_app.client.chat_postMessage(channel=TARGET_CHANNEL_ID, text=summary_text) # type: ignore
+        await send_and_confirm(signal, CHAT_ID, summary_text)
         logging.info("Posted daily summary.")
     except Exception as e:
         logging.error(f"Failed to post daily summary: {e}")
+        return
+
+    post_to_slack(TARGET_CHANNEL_ID, summary_text)
 
 async def post_reminder_callback(signal: SignalBot) -> None:
     today = date.today()
@@ -234,49 +506,56 @@ async def post_reminder_callback(signal: SignalBot) -> None:
         return 
     
     logging.info("In post_reminder_callback")
-    today_str = today.strftime("%Y-%m-%d")
+    today_str = today.isoformat()
 
     # Get all users in the group
-    group_info_task = await signal.get_group_info(CHAT_ID) # type: ignore
-    group_info_response = await group_info_task
-    group_info = group_info_response.result[0]
-    all_users = [member['uuid'] for member in group_info['members']] # type: ignore
+    all_users = [member['uuid'] for member in await get_all_users(signal) if member['number'] != MUSTERBOT_ID] # type: ignore
     
-    # Get users who have responded
+    # Get users who have responded or are on leave
     conn = db_connect()
     cursor = conn.cursor()
-    cursor.execute("SELECT user_id FROM responses WHERE response_date = ?", (today_str,))
-    responded_users = [row[0] for row in cursor.fetchall()]
-    conn.close()
-
-    # Find users who haven't responded and are not on leave
-    for user_id in all_users:
-        if user_id not in responded_users and not is_user_on_leave(user_id, today) and user_id != MUSTERBOT_ID:
-            await signal.send_message(user_id, "Just a friendly reminder to please check in for today. ☀️")
+    cursor.execute('''
+        SELECT user_id FROM responses WHERE response_date = ?
+        UNION
+        SELECT user_id FROM leave WHERE start_date <= ? AND end_date >= ?
+    ''', (today_str, today_str, today_str))
+    excused_users = {row["user_id"] for row in cursor}
+
+    # Find users who haven't responded and are not on leave, and remind them all at once
+    targets = [user_id for user_id in all_users if user_id not in excused_users]
+    results = await asyncio.gather(*(send_and_confirm(signal, user_id, REMINDER_TEXT) for user_id in targets), return_exceptions=True)
+    for user_id, result in zip(targets, results):
+        if isinstance(result, BaseException):
+            logging.error(f"Failed to send reminder to {user_id}: {result}")
 
     logging.info("Sent reminders.")
 
 # --- Prefix Callbacks ---
+# Where each argument sits in a command, keyed by (sender is admin, number of words); None means the sender / today.
+# /leave <action> [user] <start> [end] -> (action, user, start, end); extra words past the end date are ignored
+LEAVE_ARGS = {
+    (True, 5): (1, 2, 3, 4),
+    (True, 4): (1, 2, 3, 3),
+    (True, 3): (1, None, 2, 2),
+    (False, 5): (1, None, 2, 3),
+    (False, 4): (1, None, 2, 3),
+    (False, 3): (1, None, 2, 2),
+}
+# /status [user] [date] -> (user, date)
+STATUS_ARGS = {
+    (True, 3): (1, 2),
+    (True, 2): (None, 1),
+    (True, 1): (None, None),
+    (False, 2): (None, 1),
+    (False, 1): (None, None),
+}
+
 async def help_callback(signal: SignalBot, context: Context, message: DataMessage) -> bool:
     # Ensure this is a DM
     if context[1] != message.sender:
         return False
         
-    help_text = "*MusterBot Commands*\n\n"
-    help_text += "*/help* - Show this help message\n"
-    help_text += "*/status [date]* - Check your status for a given date (e.g., /status 2024-10-27). Defaults to today.\n"
-    help_text += "*/leave [add/remove] [start_date YYYY-MM-DD] [end_date YYYY-MM-DD]* - Add or remove leave.\n"
-    help_text += "*/tdy [add/remove] [start_date YYYY-MM-DD] [end_date YYYY-MM-DD]* - Add or remove tdy/training.\n"
-    if is_admin(message.sender):
-        help_text += "\n*Admin Commands*\n"
-        help_text += "*/config [key] [value]* - View or set a configuration value (e.g., /config checkin_time 08:30)\n"
-        help_text += "*/holiday [add/remove] [YYYY-MM-DD] [description]* - Add or remove a holiday.\n"
-        help_text += "*/add_admin [@user]* - Add a new admin.\n"
-        help_text += "*/status [user] [date]* - Check a user's status\n"
-        help_text += "*/get_members* - Get the members of the group\n"
-        help_text += "*/post_checkin* - Manually post the daily check-in message.\n"
-        help_text += "*/post_summary* - Manually post the daily summary.\n"
-
+    help_text = ADMIN_HELP_TEXT if is_admin(message.sender) else HELP_TEXT
     await signal.send_message(message.sender, help_text) # type: ignore
     return True
 
@@ -299,12 +578,11 @@ async def add_holiday_callback(signal: SignalBot, context: Context, message: Dat
     _, action, holiday_date_str = parts[:3]
     description = parts[3] if len(parts) > 3 else ""
 
-    try:
-        # Validate date format
-        date.fromisoformat(holiday_date_str)
-    except ValueError:
+    holiday_date = parse_date(holiday_date_str)
+    if holiday_date is None:
         await signal.send_message(message.sender_uuid, "Invalid date format. Please use YYYY-MM-DD.") # type: ignore
         return True
+    holiday_date_str = holiday_date.isoformat()
 
     conn = db_connect()
     cursor = conn.cursor()
@@ -312,18 +590,19 @@ async def add_holiday_callback(signal: SignalBot, context: Context, message: Dat
     if action.lower() == 'add':
         if not description:
             await signal.send_message(message.sender_uuid, "A description is required to add a holiday.") # type: ignore
-            conn.close()
             return True
-        cursor.execute("INSERT OR REPLACE INTO holidays (holiday_date, description) VALUES (?, ?)", (holiday_date_str, description))
+        async with _db_write_lock:
+            cursor.execute("INSERT OR REPLACE INTO holidays (holiday_date, description) VALUES (?, ?)", (holiday_date_str, description))
+        holiday_dates.add(holiday_date_str)
         await signal.send_message(message.sender_uuid, f"Holiday '{description}' on {holiday_date_str} has been added. 🥳") # type: ignore
     elif action.lower() == 'remove':
-        cursor.execute("DELETE FROM holidays WHERE holiday_date = ?", (holiday_date_str,))
+        async with _db_write_lock:
+            cursor.execute("DELETE FROM holidays WHERE holiday_date = ?", (holiday_date_str,))
+        holiday_dates.discard(holiday_date_str)
         await signal.send_message(message.sender_uuid, f"Holiday on {holiday_date_str} has been removed.") # type: ignore
     else:
         await signal.send_message(message.sender_uuid, f"Unknown action '{action}'. Please use 'add' or 'remove'.") # type: ignore
 
-    conn.commit()
-    conn.close()
     return True
 
 async def update_config_callback(signal: SignalBot, context: Context, message: DataMessage) -> bool:
@@ -336,20 +615,23 @@ async def update_config_callback(signal: SignalBot, context: Context, message: D
         conn = db_connect()
         cursor = conn.cursor()
         cursor.execute("SELECT key, value FROM config")
-        configs = cursor.fetchall()
-        conn.close()
-        config_text = "*Current Configuration*\n"
-        for key, value in configs:
-            config_text += f"\n• {key}: {value}"
+        config_lines = ["*Current Configuration*", ""]
+        config_lines += [f"• {row['key']}: {row['value']}" for row in cursor]
+        config_text = "\n".join(config_lines)
         await signal.send_message(message.sender_uuid, config_text) # type: ignore
 
     elif len(parts) == 3: # /config key value
         _, key, value = parts
+        if key in DEFAULT_JOB_TIMES:
+            parsed_time = parse_time(value)
+            if parsed_time is None:
+                await signal.send_message(message.sender_uuid, f"Invalid time for {key}. Please use HH:MM (24-hour), e.g. 08:30.") # type: ignore
+                return True
+            value = "%02d:%02d" % parsed_time
         conn = db_connect()
         cursor = conn.cursor()
-        cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)", (key, value))
-        conn.commit()
-        conn.close()
+        async with _db_write_lock:
+            cursor.execute("INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)", (key, value))
         await signal.send_message(message.sender_uuid, f"Configuration updated: {key} = {value}") # type: ignore
         # Regenerate cron callbacks with the new times
         await generate_cron_callbacks(signal)
@@ -376,9 +658,9 @@ async def add_admin_callback(signal: SignalBot, context: Context, message: DataM
     
     conn = db_connect()
     cursor = conn.cursor()
-    cursor.execute("INSERT OR IGNORE INTO admins (user_id) VALUES (?)", (new_admin_id,))
-    conn.commit()
-    conn.close()
+    async with _db_write_lock:
+        cursor.execute("INSERT OR IGNORE INTO admins (user_id) VALUES (?)", (new_admin_id,))
+    admin_ids.add(new_admin_id)
 
     await signal.send_message(message.sender_uuid, f"<@{new_admin_id}> has been added as an admin. 🛡️") # type: ignore
     return True
@@ -389,54 +671,46 @@ async def leave_callback(signal: SignalBot, context: Context, message: DataMessa
     if context[1] != message.sender:
         return False
 
-    action = ""
     parts = message.message.split() # type: ignore
     sender_is_admin = is_admin(message.sender_uuid)
-    target_user_id = None
-    start_date_str = None
-    end_date_str = None
-
-    if sender_is_admin and len(parts) >= 4:
-        target_user_id = parts[2]
-        action = parts[1]
-        start_date_str = parts[3]
-        end_date_str = parts[4] if len(parts) > 4 else start_date_str
-    if not target_user_id and len(parts) >= 3:
-        target_user_id = message.sender_uuid
-        action = parts[1]
-        start_date_str = parts[2]
-        end_date_str = parts[3] if len(parts) > 3 else start_date_str
-    if not target_user_id:
+    positions = LEAVE_ARGS.get((sender_is_admin, min(len(parts), 5)))
+    if positions is None:
         usage = "Usage: /leave <add|remove> <start_date YYYY-MM-DD> [end_date YYYY-MM-DD]\n"
         if sender_is_admin:
             usage += "Admin Usage:\n"
             usage += "  /leave [add|remove] [+123456789] [start] [end]"
         await signal.send_message(message.sender_uuid, usage)
         return True
+    action_pos, user_pos, start_pos, end_pos = positions
+    action = parts[action_pos]
+    target_user_id = parts[user_pos] if user_pos is not None else message.sender_uuid
+    start_date_str = parts[start_pos]
+    end_date_str = parts[end_pos]
     user_name = await get_username_from_userid(signal, target_user_id) # type: ignore
 
-    try:
-        date.fromisoformat(start_date_str) # type: ignore
-        date.fromisoformat(end_date_str) # type: ignore
-    except ValueError:
+    start_date = parse_date(start_date_str)
+    end_date = parse_date(end_date_str)
+    if start_date is None or end_date is None:
         await signal.send_message(message.sender_uuid, "Invalid date format. Please use YYYY-MM-DD.") # type: ignore
         return True
+    start_date_str = start_date.isoformat()
+    end_date_str = end_date.isoformat()
 
     conn = db_connect()
     cursor = conn.cursor()
 
     if action.lower() == 'add':
-        cursor.execute("INSERT INTO leave (user_id, user_name, start_date, end_date) VALUES (?, ?, ?, ?)", (target_user_id, user_name, start_date_str, end_date_str))
+        async with _db_write_lock:
+            cursor.execute("INSERT INTO leave (user_id, user_name, start_date, end_date) VALUES (?, ?, ?, ?)", (target_user_id, user_name, start_date_str, end_date_str))
         await signal.send_message(message.sender_uuid, f"Leave has been added for {user_name} from {start_date_str} to {end_date_str}. 🌴") # type: ignore
     elif action.lower() == 'remove':
         # This will remove all leave entries for the user that start on the specified date.
-        cursor.execute("DELETE FROM leave WHERE user_id = ? AND start_date = ?", (target_user_id, start_date_str))
+        async with _db_write_lock:
+            cursor.execute("DELETE FROM leave WHERE user_id = ? AND start_date = ?", (target_user_id, start_date_str))
         await signal.send_message(message.sender_uuid, f"Leave starting on {start_date_str} for {user_name} has been removed.") # type: ignore
     else:
         await signal.send_message(message.sender_uuid, f"Unknown action '{action}'. Please use 'add' or 'remove'.") # type: ignore
 
-    conn.commit()
-    conn.close()
     return True
 
 async def tdy_callback(signal: SignalBot, context: Context, message: DataMessage) -> bool:
@@ -453,24 +727,22 @@ async def tdy_callback(signal: SignalBot, context: Context, message: DataMessage
 
     _, start_date_str, end_date_str, description = parts
 
-    try:
-        start = date.fromisoformat(start_date_str)
-        end = date.fromisoformat(end_date_str)
-        if start > end:
-            await signal.send_message(message.sender, "The start date cannot be after the end date.") # type: ignore
-            return True
-    except ValueError:
+    start = parse_date(start_date_str)
+    end = parse_date(end_date_str)
+    if start is None or end is None:
         await signal.send_message(message.sender, "Invalid date format. Please use YYYY-MM-DD.") # type: ignore
         return True
+    if start > end:
+        await signal.send_message(message.sender, "The start date cannot be after the end date.") # type: ignore
+        return True
 
     conn = db_connect()
     cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO tdy (user_id, start_date, end_date, description) VALUES (?, ?, ?, ?)",
-        (message.sender_uuid, start_date_str, end_date_str, description)
-    )
-    conn.commit()
-    conn.close()
+    async with _db_write_lock:
+        cursor.execute(
+            "INSERT INTO tdy (user_id, start_date, end_date, description) VALUES (?, ?, ?, ?)",
+            (message.sender_uuid, start.isoformat(), end.isoformat(), description)
+        )
 
     await signal.send_message(message.sender, f"Got it. I've logged your status as '{description}' from {start_date_str} to {end_date_str}. ✈️") # type: ignore
     return True
@@ -479,12 +751,10 @@ async def get_members_callback(signal: SignalBot, context: Context, message: Dat
     # Admin and DM only
     if not is_admin(message.sender_uuid) or context[1] != message.sender:
         return False
-    all_users = await get_all_users(signal)
-    output = f""
-    for user in all_users:
-        username = await get_username_from_userid(signal, user['uuid'])
-        output += f"{username}: {user['number']}\n"
-    output += f"\n"
+    # Always fetch fresh membership when an admin asks for it
+    all_users = await get_all_users(signal, refresh=True)
+    usernames = await asyncio.gather(*(get_username_from_userid(signal, user['uuid']) for user in all_users))
+    output = "".join(f"{username}: {user['number']}\n" for username, user in zip(usernames, all_users)) + "\n"
     await signal.send_message(message.sender_uuid, output) 
     return True
 
@@ -496,19 +766,8 @@ async def status_callback(signal: SignalBot, context: Context, message: DataMess
 
     parts = message.message.split() # type: ignore
     sender_is_admin = is_admin(message.sender_uuid)
-    target_user_id = None
-    target_date = None
-
-    if sender_is_admin and len(parts) == 3:
-        target_date = parts[2]
-        target_user_id = parts[1]
-    if not target_user_id and len(parts) == 2:
-        target_user_id = message.sender_uuid
-        target_date = parts[1]
-    if not target_user_id and len(parts) == 1:
-        target_user_id = message.sender_uuid
-        target_date = date.today().strftime("%Y-%m-%d")
-    if not target_user_id:
+    positions = STATUS_ARGS.get((sender_is_admin, len(parts)))
+    if positions is None:
         usage =  "Usage: /status [date]\n"
         usage += "  (Note: date should be in YYYY-MM-DD format)\n"
         if sender_is_admin:
@@ -517,32 +776,32 @@ async def status_callback(signal: SignalBot, context: Context, message: DataMess
             usage += "  (Note: user should be in '+15551234567' format)"
         await signal.send_message(message.sender_uuid, usage)
         return True
-    
-    user_name = await get_username_from_userid(signal, target_user_id) # type: ignore
+    user_pos, date_pos = positions
+    target_user_id = parts[user_pos] if user_pos is not None else message.sender_uuid
+    target_date = parts[date_pos] if date_pos is not None else date.today().isoformat()
 
-    try:
-        date.fromisoformat(target_date) # type: ignore
-    except ValueError:
+    parsed_date = parse_date(target_date)
+    if parsed_date is None:
         await signal.send_message(message.sender_uuid, "Invalid date format. Please use YYYY-MM-DD.") # type: ignore
         return True
+    target_date = parsed_date.isoformat()
 
     conn = db_connect()
     cursor = conn.cursor()
 
-    cursor.execute("SELECT user_id, user_name, response_date, response_text, details FROM responses WHERE user_id = ? AND response_date = ?", (target_user_id, target_date))
-    responses = cursor.fetchall()
-    conn.close()
-    output = f""
-    for _, user_name, _, text, details in responses:
-        output += f"{user_name}: {text} ({details})\n"
+    cursor.execute("SELECT user_name, response_text, details FROM responses WHERE user_id = ? AND response_date = ?", (target_user_id, target_date))
+    output = "".join(f"{row['user_name']}: {row['response_text']} ({row['details']})\n" for row in cursor)
     await signal.send_message(message.sender_uuid, output)
     return True
 
 # --- Message Callbacks ---
 async def message_callback(signal: SignalBot, context: Context, message: DataMessage) -> bool:
     """ This callback handles all messages (not prefix or cron callbacks) """
-    print(message.sender_uuid)
-    print(update_status_ts)
+    logging.debug("Message from %s (pending follow-ups: %r)", message.sender_uuid, update_status_ts)
+    # log all messages that are sent, before dispatch so the log isn't held up by (or lost to) the handlers below.
+    # Reactions and other events without text skip straight to dispatch.
+    if message.message:
+        log_message(context, message)
     # first check to see if this is in the main group or it's a dm
     if context[1] == CHAT_ID:
         # it's in the main thread.  The only things that should be here are reactions.
@@ -551,20 +810,6 @@ async def message_callback(signal: SignalBot, context: Context, message: DataMes
     # if it's not in the main chat, it should be a dm. Check to see if it's an update response.
     elif message.sender_uuid in update_status_ts:
         await update_status_callback(signal, context, message)
-    # log all messages that are sent 
-    try:
-        if message.message:
-            conn = db_connect()
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO messages (sender_id, sender_name, destination_id, sent_timestamp, message) VALUES (?, ?, ?, ?, ?)",
-                (message.sender_uuid, message.sender_name, context[1], message.timestamp, message.message)
-            )
-            conn.commit()
-            conn.close()
-    except Exception as e:
-        logging.error(f"Error handling response: {e}")
-        return False
     return True
     
 async def react_callback(signal: SignalBot, context: Context, message: DataMessage) -> bool:
@@ -573,36 +818,35 @@ async def react_callback(signal: SignalBot, context: Context, message: DataMessa
         return False # Not a reaction to a check-in message
 
     emoji = message.reaction["emoji"] # type: ignore
-    status_info = STATUS_MAP.get(emoji)
+    status_info = STATUS_LOOKUP.get(emoji_key(emoji))
 
-    if not status_info:
+    if status_info is None:
         # Invalid emoji reaction
         await signal.send_message(message.sender_uuid, f"I don't understand the '{emoji}' emoji. Please react with one of the emojis from the daily check-in message.") # type: ignore
         return True
 
-    status = status_info["text"]
-    response_message = status_info.get("prompt")
+    status, response_message = status_info
     details = None
 
      # DM for more information if needed
     if response_message:
-        print(message.sender_uuid)
+        logging.debug("Asking %s for status details", message.sender_uuid)
         response_task = await signal.send_message(message.sender, response_message) # type: ignore
         response_object = await response_task
         the_result = response_object.result
         # Store the user_id and the status for which we are awaiting details
-        update_status_ts[message.sender_uuid] = {"timestamp": the_result['timestamp'], "status": status, "response_date": today_str}
+        prune_pending_statuses()
+        update_status_ts[message.sender_uuid] = {"timestamp": the_result['timestamp'], "status": status, "response_date": today_str, "inserted_at": time.monotonic()}
     else:
         # If no more info is needed, save directly to the database
         try:
             conn = db_connect()
             cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO responses (user_id, user_name, response_date, response_text, details) VALUES (?, ?, ?, ?, ?)",
-                (message.sender_uuid, message.sender_name, today_str, status, details)
-            )
-            conn.commit()
-            conn.close()
+            async with _db_write_lock:
+                cursor.execute(
+                    "INSERT OR REPLACE INTO responses (user_id, user_name, response_date, response_text, details) VALUES (?, ?, ?, ?, ?)",
+                    (message.sender_uuid, message.sender_name, today_str, status, details)
+                )
             # Acknowledge the check-in
             await signal.send_message(message.sender_uuid, f"Thanks for checking in! I've marked you as '{status}' for {today_str}.") # type: ignore
         except Exception as e:
@@ -620,12 +864,11 @@ async def update_status_callback(signal: SignalBot, context: Context, message: D
     try:
         conn = db_connect()
         cursor = conn.cursor()
-        cursor.execute(
-            "INSERT OR REPLACE INTO responses (user_id, user_name, response_date, response_text, details) VALUES (?, ?, ?, ?, ?)",
-            (message.sender_uuid, message.sender_name, response_date, status, details)
-        )
-        conn.commit()
-        conn.close()
+        async with _db_write_lock:
+            cursor.execute(
+                "INSERT OR REPLACE INTO responses (user_id, user_name, response_date, response_text, details) VALUES (?, ?, ?, ?, ?)",
+                (message.sender_uuid, message.sender_name, response_date, status, details)
+            )
         # Confirm the update with the user
         await signal.send_message(message.sender_uuid, f"Got it! Your status has been updated to '{status}' with the details: '{details}'.") # type: ignore
     except Exception as e:
@@ -665,7 +908,13 @@ async def test_post_daily_summary_callback(signal: SignalBot, context: Context,
     await post_daily_summary_callback(signal)
     return True
 
-# --- Deprecated Functions ---
+# --- Job Scheduling ---
+JOB_CBS = {
+    'checkin': post_daily_checkin_callback,
+    'reminder': post_reminder_callback,
+    'summary': post_daily_summary_callback,
+}
+
 async def generate_cron_callbacks(signal: SignalBot) -> None:
     # Stop all the currently sleeping jobs
     signal.stop_crons() # type: ignore
@@ -675,77 +924,132 @@ async def generate_cron_callbacks(signal: SignalBot) -> None:
     cursor = conn.cursor()
     cursor.execute("SELECT key, value FROM config")
     configs = dict(cursor.fetchall())
-    conn.close()
 
-    cron_jobs = {
-        'checkin': configs.get('checkin_time', '06:00'),
-        'reminder': configs.get('reminder_time', '09:00'),
-        'summary': configs.get('summary_time', '10:00')
-    }
-    
-    for job_name, local_time_str in cron_jobs.items():
-        local_hour, local_minute = map(int, local_time_str.split(':'))
-        
-        cron_string = f"{local_minute} {local_hour} * * 1-5" # Run Monday to Friday
-        if job_name == 'checkin':
-            add_cron_while_running(signal, (cron_string, post_daily_checkin_callback)) # type: ignore
-            logging.info(f"Scheduled daily check-in: {cron_string}")
-        elif job_name == 'reminder':
-            add_cron_while_running(signal, (cron_string, post_reminder_callback)) # type: ignore
-            logging.info(f"Scheduled reminder: {cron_string}")
-        elif job_name == 'summary':
-            add_cron_while_running(signal, (cron_string, post_daily_summary_callback)) # type: ignore
-            logging.info(f"Scheduled summary: {cron_string}")
+    jobs = []
+    for job_name in JOB_CBS:
+        key = f"{job_name}_time"
+        local_time_str = configs.get(key, DEFAULT_JOB_TIMES[key])
+        parsed_time = parse_time(local_time_str)
+        if parsed_time is None:
+            # A bad stored value shouldn't stop the job (or the bot) from running
+            logging.error(f"Invalid {key} {local_time_str!r} in config, using {DEFAULT_JOB_TIMES[key]}")
+            parsed_time = parse_time(DEFAULT_JOB_TIMES[key])
+        local_hour, local_minute = parsed_time # type: ignore
+
+        jobs.append((local_hour, local_minute, JOB_CBS[job_name]))
+        logging.info("Scheduled %s: %02d:%02d Mon-Fri", job_name, local_hour, local_minute)
+    # Arm every job in one go, relative to the same instant
+    schedule_weekday_jobs(signal, jobs)
 
 async def test_generate_cron_callback(signal: SignalBot, context: Context, message: DataMessage) -> bool:
     await generate_cron_callbacks(signal)
     return True
 
+# --- Command Routing ---
+PREFIX_ROUTES = {
+    "/help": help_callback,
+    "/leave": leave_callback,
+    "/tdy": tdy_callback,
+    "/holiday": add_holiday_callback,
+    "/add_admin": add_admin_callback,
+    "/config": update_config_callback,
+    "/get_members": get_members_callback,
+    "/ping": ping_callback,
+    # Manually run the daily jobs
+    "/post_checkin": test_post_daily_checkin_callback,
+    "/post_reminder": test_post_reminder_callback,
+    "/post_summary": test_post_daily_summary_callback,
+}
+if MUSTERBOT_DEBUG:
+    PREFIX_ROUTES["/test_group"] = test_group_info_callback
+
+async def prefix_router(signal: SignalBot, context: Context, message: DataMessage) -> bool:
+    """Dispatches a command to its callback by the message's first word. Unhandled messages fall through to message_callback."""
+    words = message.message.split(maxsplit=1) if message.message else None
+    if not words:
+        return False
+    callback = PREFIX_ROUTES.get(words[0])
+    if callback is None:
+        return False
+    return await callback(signal, context, message)
+
+def check_environment():
+    """Raises if required settings are missing, before any time is spent connecting to signal-cli or Slack."""
+    required = {"MUSTERBOT_ID": MUSTERBOT_ID, "CHAT_ID": CHAT_ID, "DATABASE_FILE": DATABASE_FILE}
+    if ENABLE_SLACK:
+        required["TARGET_CHANNEL_ID"] = TARGET_CHANNEL_ID
+    elif SLACK_BOT_TOKEN or SLACK_APP_TOKEN:
+        raise RuntimeError("SLACK_BOT_TOKEN and SLACK_APP_TOKEN must be set together")
+    missing = [name for name, value in required.items() if not value]
+    if missing:
+        raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
+
 async def main():
     """Entrypoint"""
     global slack_app
+    check_environment()
+    # Start tasks eagerly so ones that finish without blocking skip a trip through the event loop (Python 3.12+)
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
     setup_database()
 
     # Create our Signal-Bot
     signal = await create(AccountNumber(MUSTERBOT_ID)) # type: ignore
 
-    # Create our Slack-Bot
-    slack_app = AsyncApp(token=SLACK_BOT_TOKEN)
-    slack_handler = AsyncSocketModeHandler(slack_app, SLACK_APP_TOKEN)
-
-    # Register prefix callbacks
-    signal.on_prefix("/help", help_callback)
-    signal.on_prefix("/leave", leave_callback)   
-    signal.on_prefix('/tdy', tdy_callback)
-    signal.on_prefix("/holiday", add_holiday_callback)
-    signal.on_prefix("/add_admin", add_admin_callback)
-    signal.on_prefix("/config", update_config_callback)
-    signal.on_prefix("/get_members", get_members_callback)
-    signal.on_prefix('/ping', ping_callback)
-    
-    # Register a callback to deal with messages
+    # Register the command router, then a callback to deal with everything else
+    signal.on_message(prefix_router)
     signal.on_message(message_callback)
 
-    # Register cron callbacks
-    signal.on_cron("0 6 * * 1-5", post_daily_checkin_callback)
-    signal.on_cron("0 8 * * 1-5", post_reminder_callback)
-    signal.on_cron("0 10 * * 1-5", post_daily_summary_callback)
-
-    # Register testing callbacks
-    signal.on_prefix("/test_group", test_group_info_callback)
-    signal.on_prefix("/post_checkin", test_post_daily_checkin_callback)
-    signal.on_prefix("/post_reminder", test_post_reminder_callback)
-    signal.on_prefix("/post_summary", test_post_daily_summary_callback)
-    logging.info("Starting Signal and Slack bots...")
-    await asyncio.gather(
-        signal.run(),
-        slack_handler.start_async()
-    )
-    await signal.run()
+    # Schedule the check-in, reminder and summary at the times in the config table
+    await generate_cron_callbacks(signal)
+
+    # Create our Slack-Bot
+    slack_session = None
+    if ENABLE_SLACK:
+        # Without a session the web client opens a new connection (and TLS handshake) for every API call
+        slack_session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300))
+        slack_app = AsyncApp(token=SLACK_BOT_TOKEN)
+        slack_app.client.session = slack_session
+        slack_handler = AsyncSocketModeHandler(slack_app, SLACK_APP_TOKEN)
+
+    logging.info("Starting Signal and Slack bots..." if ENABLE_SLACK else "Starting Signal bot (Slack disabled)...")
+    log_flusher = asyncio.create_task(message_log_flusher(), name="message-log-flusher")
+    slack_flusher = asyncio.create_task(slack_outbox_flusher(), name="slack-outbox-flusher") if ENABLE_SLACK else None
+    # The flushers run outside the TaskGroup so a crash doesn't take the bot down, but it still gets logged
+    for task in (log_flusher, slack_flusher):
+        if task is not None:
+            task.add_done_callback(log_task_failure)
+    try:
+        # If either client fails, the TaskGroup cancels the other instead of leaving it running
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(signal.run(), name="signal-bot")
+            if ENABLE_SLACK:
+                tg.create_task(slack_handler.start_async(), name="slack-socket-mode")
+    finally:
+        background = [task for task in (log_flusher, slack_flusher) if task is not None]
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        if slack_session is not None:
+            await slack_session.close()
+        db_close()
 
 if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO)
+    # Log records are handed off to a background thread, so the event loop never waits on writes to stderr
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    log_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    log_listener.start()
     try:
-        asyncio.run(main())
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
-        logging.info("Shutting down...")
\ No newline at end of file
+        logging.info("Shutting down...")
+    finally:
+        log_listener.stop()
\ No newline at end of file